@@ -1,431 +1,53 @@
 #!/usr/bin/env python3
+import functools
+import json
 import threading
 import time
-from collections import deque
+from pathlib import Path
 
 import webview
 
 import streaming
 
-HTML = r"""<!doctype html>
-<html>
-  <head>
-    <meta charset="utf-8" />
-    <title>Sound Transport</title>
-    <style>
-      :root {
-        --bg1: #f3efe5;
-        --bg2: #e6f0ff;
-        --ink: #232323;
-        --muted: #5f6166;
-        --accent: #1a5d8f;
-        --accent-2: #d77a1c;
-        --card: #ffffff;
-        --stroke: #d9d3c7;
-        --shadow: rgba(0, 0, 0, 0.08);
-      }
-      * { box-sizing: border-box; }
-      body {
-        margin: 0;
-        font-family: "Trebuchet MS", Verdana, Tahoma, sans-serif;
-        color: var(--ink);
-        background:
-          radial-gradient(circle at 15% 15%, #fff6d8 0, transparent 55%),
-          radial-gradient(circle at 85% 10%, #dff2ff 0, transparent 45%),
-          linear-gradient(135deg, var(--bg1), var(--bg2));
-        min-height: 100vh;
-      }
-      .wrap {
-        max-width: 980px;
-        margin: 24px auto;
-        padding: 12px 18px 28px;
-      }
-      .hero {
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        gap: 16px;
-        padding: 16px 18px;
-        border-radius: 16px;
-        background: var(--card);
-        box-shadow: 0 12px 30px var(--shadow);
-        border: 1px solid var(--stroke);
-      }
-      .hero h1 {
-        margin: 0 0 6px 0;
-        font-family: "Palatino Linotype", "Book Antiqua", Palatino, serif;
-        font-size: 28px;
-        letter-spacing: 0.6px;
-      }
-      .hero p {
-        margin: 0;
-        color: var(--muted);
-        font-size: 14px;
-      }
-      .badge {
-        padding: 6px 12px;
-        border-radius: 999px;
-        background: linear-gradient(120deg, var(--accent), var(--accent-2));
-        color: #fff;
-        font-weight: 600;
-        letter-spacing: 0.4px;
-        font-size: 12px;
-        text-transform: uppercase;
-      }
-      .mode {
-        margin: 16px 0 8px;
-        display: inline-flex;
-        padding: 6px;
-        border-radius: 999px;
-        background: rgba(255, 255, 255, 0.85);
-        border: 1px solid var(--stroke);
-        box-shadow: 0 8px 16px var(--shadow);
-      }
-      .pill {
-        border: none;
-        background: transparent;
-        padding: 8px 16px;
-        font-weight: 600;
-        color: var(--muted);
-        cursor: pointer;
-        border-radius: 999px;
-      }
-      .pill.active {
-        background: var(--accent);
-        color: #fff;
-      }
-      .panel {
-        display: none;
-        margin-top: 16px;
-        padding: 18px;
-        border-radius: 16px;
-        background: var(--card);
-        border: 1px solid var(--stroke);
-        box-shadow: 0 12px 30px var(--shadow);
-        animation: fadeUp 0.45s ease both;
-      }
-      .panel.active { display: block; }
-      .grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(220px, 1fr));
-        gap: 14px;
-      }
-      .field {
-        display: flex;
-        flex-direction: column;
-        gap: 6px;
-        font-size: 13px;
-        color: var(--muted);
-      }
-      .field input, .field select {
-        padding: 8px 10px;
-        border-radius: 10px;
-        border: 1px solid var(--stroke);
-        font-size: 14px;
-      }
-      .actions {
-        display: flex;
-        gap: 10px;
-        margin-top: 14px;
-      }
-      .btn {
-        border: none;
-        padding: 10px 16px;
-        border-radius: 12px;
-        font-weight: 700;
-        cursor: pointer;
-        background: var(--accent);
-        color: #fff;
-      }
-      .btn.secondary { background: #444; }
-      .status {
-        margin-top: 10px;
-        font-size: 12px;
-        color: var(--muted);
-      }
-      .note {
-        margin-top: 8px;
-        font-size: 12px;
-        color: var(--muted);
-      }
-      .logwrap {
-        margin-top: 18px;
-        padding: 12px;
-        border-radius: 12px;
-        border: 1px dashed var(--stroke);
-        background: rgba(255, 255, 255, 0.7);
-      }
-      .logwrap h3 {
-        margin: 0 0 8px;
-        font-size: 12px;
-        letter-spacing: 1px;
-        text-transform: uppercase;
-        color: var(--muted);
-      }
-      pre {
-        margin: 0;
-        font-size: 12px;
-        line-height: 1.35;
-        max-height: 140px;
-        overflow: auto;
-      }
-      @keyframes fadeUp {
-        from { opacity: 0; transform: translateY(10px); }
-        to { opacity: 1; transform: translateY(0); }
-      }
-      body.ready .hero { animation: fadeUp 0.5s ease both; }
-      body.ready .mode { animation: fadeUp 0.6s ease both; }
-      body.ready .panel.active { animation: fadeUp 0.7s ease both; }
-    </style>
-  </head>
-  <body>
-    <div class="wrap">
-      <div class="hero">
-        <div>
-          <h1>Sound Transport</h1>
-          <p>Send microphone or system audio, or receive a stream on this machine.</p>
-          <p id="os-note" class="note"></p>
-        </div>
-        <div class="badge">TCP audio</div>
-      </div>
-
-      <div class="mode">
-        <button id="mode-send" class="pill">Send</button>
-        <button id="mode-recv" class="pill">Receive</button>
-      </div>
-
-      <section id="panel-send" class="panel">
-        <div class="grid">
-          <label class="field">Connection code
-            <input
-              id="client-code"
-              placeholder="123 456 789"
-              inputmode="numeric"
-              pattern="[0-9 ]*"
-              autocomplete="off"
-              maxlength="11"
-            />
-          </label>
-          <label class="field">Capture source
-            <select id="client-source">
-              <option value="mic">Microphone</option>
-              <option value="system" selected>System audio</option>
-            </select>
-          </label>
-          <label class="field">Capture device
-            <select id="client-device"></select>
-          </label>
-        </div>
-        <div class="actions">
-          <button class="btn" id="client-start">Start sending</button>
-          <button class="btn secondary" id="client-stop">Stop</button>
-        </div>
-        <div class="status" id="client-status">Idle</div>
-        <div class="note" id="client-code-note">Paste the code from the receiver.</div>
-        <div class="note" id="client-source-note"></div>
-      </section>
-
-      <section id="panel-recv" class="panel">
-        <div class="grid">
-          <label class="field">Share code
-            <input
-              id="server-code"
-              readonly
-              inputmode="numeric"
-              maxlength="11"
-            />
-          </label>
-          <label class="field">Output device
-            <select id="server-device"></select>
-          </label>
-        </div>
-        <div class="actions">
-          <button class="btn" id="server-start">Start receiving</button>
-          <button class="btn secondary" id="server-stop">Stop</button>
-        </div>
-        <div class="status" id="server-status">Idle</div>
-        <div class="note" id="server-code-note">Give this code to the sender.</div>
-      </section>
-
-      <div class="logwrap">
-        <h3>Activity</h3>
-        <pre id="log"></pre>
-      </div>
-    </div>
-
-    <script>
-      const DEFAULT_MODE = "{{DEFAULT_MODE}}";
-      const els = (id) => document.getElementById(id);
-      const panels = { send: els("panel-send"), recv: els("panel-recv") };
-      const pills = { send: els("mode-send"), recv: els("mode-recv") };
-      let deviceData = null;
-
-      function digitsOnly(value) {
-        return (value || "").replace(/\D/g, "").slice(0, 9);
-      }
-
-      function formatCode(value) {
-        const digits = digitsOnly(value);
-        const groups = [];
-        for (let i = 0; i < digits.length; i += 3) {
-          groups.push(digits.slice(i, i + 3));
-        }
-        return groups.join(" ");
-      }
-
-      function setMode(mode) {
-        Object.keys(panels).forEach((key) => {
-          panels[key].classList.toggle("active", key === mode);
-          pills[key].classList.toggle("active", key === mode);
-        });
-      }
-
-      function fillSelect(select, items, defaultIndex) {
-        select.innerHTML = "";
-        const opt = document.createElement("option");
-        opt.value = "";
-        opt.textContent = "Default";
-        select.appendChild(opt);
-        items.forEach((item) => {
-          const option = document.createElement("option");
-          option.value = String(item.index);
-          option.textContent = `${item.index}: ${item.name}`;
-          if (defaultIndex !== null && Number(defaultIndex) === item.index) {
-            option.selected = true;
-          }
-          select.appendChild(option);
-        });
-      }
-
-      function applyClientDeviceList() {
-        if (!deviceData) {
-          return;
-        }
-        const source = els("client-source").value;
-        let devices = deviceData.inputs || [];
-        let defaultDevice = deviceData.default_input;
-        let note = "";
-        if (source === "system") {
-          devices = deviceData.system_devices || devices;
-          defaultDevice = deviceData.default_system_device;
-          note = deviceData.system_note || "";
-        }
-        fillSelect(els("client-device"), devices, defaultDevice);
-        els("client-source-note").textContent = note;
-      }
+LOG_CAPACITY = 256  # power of two so the write index can be masked
+LOG_MASK = LOG_CAPACITY - 1
+SEND_BATCH = 8
+SERVER_IO_WORKERS = 1  # one output stream per connection; keep to one sender
 
-      function applyOsNote() {
-        if (!deviceData || !deviceData.os) {
-          return;
-        }
-        els("os-note").textContent = `Detected OS: ${deviceData.os}`;
-      }
-
-      async function loadDevices() {
-        const api = window.pywebview.api;
-        const data = await api.list_devices();
-        deviceData = data || {};
-        if (els("client-source").value !== "system") {
-          els("client-source").value = "system";
-        }
-        applyClientDeviceList();
-        fillSelect(els("server-device"), data.outputs || [], data.default_output);
-        applyOsNote();
-      }
-
-      async function startClient() {
-        const api = window.pywebview.api;
-        const cfg = {
-          code: digitsOnly(els("client-code").value),
-          source: els("client-source").value,
-          device: els("client-device").value,
-        };
-        await api.start_client(cfg);
-      }
-
-      async function stopClient() {
-        await window.pywebview.api.stop_client();
-      }
-
-      async function startServer() {
-        const api = window.pywebview.api;
-        const cfg = {
-          device: els("server-device").value,
-        };
-        await api.start_server(cfg);
-      }
-
-      async function stopServer() {
-        await window.pywebview.api.stop_server();
-      }
-
-      async function refreshStatus() {
-        const api = window.pywebview.api;
-        const status = await api.get_status();
-        const clientRunning = status.client.running;
-        const clientConnected = status.client.connected;
-        const serverRunning = status.server.running;
-        const serverConnected = status.server.connected;
-        const serverCode = status.server.code || "";
-        const clientError = status.client.error || "";
-        const serverError = status.server.error || "";
-        els("client-status").textContent = clientRunning
-          ? (clientConnected ? "Sending..." : "Connecting...")
-          : (clientError ? `Error: ${clientError}` : "Idle");
-        els("server-status").textContent = serverRunning
-          ? (serverConnected ? "Connected" : "Waiting for sender")
-          : (serverError ? `Error: ${serverError}` : "Idle");
-        els("server-code").value = formatCode(serverCode);
-        if (!serverCode) {
-          els("server-code").setAttribute("placeholder", "Start receiving...");
-        } else {
-          els("server-code").removeAttribute("placeholder");
-        }
-        els("client-start").disabled = status.client.running;
-        els("client-stop").disabled = !status.client.running;
-        els("server-start").disabled = status.server.running;
-        els("server-stop").disabled = !status.server.running;
-        els("log").textContent = (status.logs || []).join("\n");
-      }
-
-      function wireEvents() {
-        pills.send.addEventListener("click", () => setMode("send"));
-        pills.recv.addEventListener("click", () => setMode("recv"));
-        els("client-start").addEventListener("click", startClient);
-        els("client-stop").addEventListener("click", stopClient);
-        els("client-source").addEventListener("change", applyClientDeviceList);
-        els("client-code").addEventListener("input", () => {
-          els("client-code").value = formatCode(els("client-code").value);
-        });
-        els("server-start").addEventListener("click", startServer);
-        els("server-stop").addEventListener("click", stopServer);
-      }
-
-      function init() {
-        setMode(DEFAULT_MODE === "recv" ? "recv" : "send");
-        wireEvents();
-        loadDevices();
-        refreshStatus();
-        setInterval(refreshStatus, 800);
-        document.body.classList.add("ready");
-      }
-
-      window.addEventListener("pywebviewready", init);
-    </script>
-  </body>
-</html>
-"""
+CLIENT_IDLE_STATE = {"client_running": False, "client_connected": False}
+SERVER_IDLE_STATE = {
+    "server_running": False,
+    "server_connected": False,
+    "server_port": None,
+    "server_host": None,
+    "server_code": "",
+}
+
+_HTML_PATH = Path(__file__).with_name("index.html")
+
+
+@functools.lru_cache(maxsize=None)
+def _get_html(default_mode):
+    template = _HTML_PATH.read_text(encoding="utf-8")
+    return template.replace("{{DEFAULT_MODE}}", default_mode)
+
+
+def _thread_alive(thread):
+    return thread is not None and thread.is_alive()
 
 
 class StreamController:
     def __init__(self):
         self.client_thread = None
         self.server_thread = None
-        self.client_stop = threading.Event()
-        self.server_stop = threading.Event()
-        self.logs = deque(maxlen=200)
+        self.client_stop = streaming.StopEvent()
+        self.server_stop = streaming.StopEvent()
+        self._log_buf = [""] * LOG_CAPACITY
+        self._log_seq = 0
         self.log_lock = threading.Lock()
         self.state_lock = threading.Lock()
+        self._state_dirty = threading.Event()
+        self._status_snapshot = None
         self.state = {
             "client_running": False,
             "client_connected": False,
@@ -433,6 +55,7 @@ class StreamController:
             "server_connected": False,
             "server_port": None,
             "server_host": None,
+            "server_code": "",
             "client_error": "",
             "server_error": "",
         }
@@ -441,9 +64,22 @@ class StreamController:
         timestamp = time.strftime("%H:%M:%S")
         line = f"{timestamp} {message}"
         with self.log_lock:
-            self.logs.append(line)
+            self._log_buf[self._log_seq & LOG_MASK] = line
+            self._log_seq += 1
+        self._state_dirty.set()
+
+    def get_logs(self, since_seq=0):
+        with self.log_lock:
+            seq = self._log_seq
+            start = max(int(since_seq or 0), seq - LOG_CAPACITY, 0)
+            logs = [self._log_buf[i & LOG_MASK] for i in range(start, seq)]
+        return {"seq": seq, "logs": logs}
 
     def _coerce_int(self, value, default, label):
+        # The UI and decode_pair_code already hand over ints; only strings from
+        # older callers need parsing.
+        if type(value) is int:
+            return value
         try:
             return int(value)
         except (TypeError, ValueError):
@@ -452,24 +88,47 @@ class StreamController:
 
     def _set_state(self, key, value):
         with self.state_lock:
+            if self.state.get(key) == value:
+                return
             self.state[key] = value
+        self._state_dirty.set()
+
+    def _set_states(self, **updates):
+        changed = False
+        with self.state_lock:
+            for key, value in updates.items():
+                if self.state.get(key) != value:
+                    self.state[key] = value
+                    changed = True
+        if changed:
+            self._state_dirty.set()
+
+    def wait_for_change(self, timeout=1.0):
+        changed = self._state_dirty.wait(timeout)
+        self._state_dirty.clear()
+        return changed
+
+    def _reset_idle_locked(self, idle_state):
+        # Caller holds state_lock; returns True if anything changed.
+        changed = False
+        for key, value in idle_state.items():
+            if self.state[key] != value:
+                self.state[key] = value
+                changed = True
+        return changed
 
     def _client_running(self):
-        if self.client_thread and self.client_thread.is_alive():
+        if _thread_alive(self.client_thread):
             return True
         self.client_thread = None
-        self._set_state("client_running", False)
-        self._set_state("client_connected", False)
+        self._set_states(**CLIENT_IDLE_STATE)
         return False
 
     def _server_running(self):
-        if self.server_thread and self.server_thread.is_alive():
+        if _thread_alive(self.server_thread):
             return True
         self.server_thread = None
-        self._set_state("server_running", False)
-        self._set_state("server_connected", False)
-        self._set_state("server_port", None)
-        self._set_state("server_host", None)
+        self._set_states(**SERVER_IDLE_STATE)
         return False
 
     def start_client(self, cfg):
@@ -517,6 +176,10 @@ class StreamController:
                 source,
                 self._set_state,
             ),
+            kwargs={
+                "batch": SEND_BATCH,
+                "states_cb": self._set_states,
+            },
             daemon=True,
         )
         self.client_thread = thread
@@ -536,6 +199,8 @@ class StreamController:
             return {"ok": False}
 
         self._set_state("server_error", "")
+        # Re-resolve on each start in case the machine changed networks.
+        streaming.invalidate_network_cache()
         bind_host = (cfg.get("bind") or "0.0.0.0").strip()
         if not bind_host:
             bind_host = "0.0.0.0"
@@ -563,6 +228,10 @@ class StreamController:
                 self._log,
                 self._set_state,
             ),
+            kwargs={
+                "io_workers": SERVER_IO_WORKERS,
+                "states_cb": self._set_states,
+            },
             daemon=True,
         )
         self.server_thread = thread
@@ -577,41 +246,60 @@ class StreamController:
         return {"ok": False}
 
     def status(self):
-        client_running = self._client_running()
-        server_running = self._server_running()
-        with self.log_lock:
-            logs = list(self.logs)
-        with self.state_lock:
-            state = dict(self.state)
-        state["client_running"] = client_running
-        state["server_running"] = server_running
-        if not client_running:
-            state["client_connected"] = False
-        if not server_running:
-            state["server_connected"] = False
-            state["server_port"] = None
-            state["server_host"] = None
-        code = ""
-        if server_running and state.get("server_port"):
-            host = state.get("server_host") or streaming.advertised_host("0.0.0.0")
-            try:
-                code = streaming.encode_pair_code(host, state["server_port"])
-            except ValueError as exc:
-                self._log(f"Code error: {exc}")
-        return {
+        client_running = _thread_alive(self.client_thread)
+        server_running = _thread_alive(self.server_thread)
+        log_seq = self._log_seq
+        # Never make a worker wait on the UI: if a worker holds the lock,
+        # serve the previous snapshot and pick up the change next time. Idle
+        # resets happen under the same try-lock, and only when needed.
+        if not self.state_lock.acquire(blocking=False):
+            if self._status_snapshot is not None:
+                return self._status_snapshot
+            self.state_lock.acquire()
+        try:
+            changed = False
+            if not client_running:
+                changed = self._reset_idle_locked(CLIENT_IDLE_STATE)
+            if not server_running:
+                changed = self._reset_idle_locked(SERVER_IDLE_STATE) or changed
+            state = self.state
+            client_connected = state["client_connected"]
+            server_connected = state["server_connected"]
+            server_code = state["server_code"]
+            client_error = state["client_error"]
+            server_error = state["server_error"]
+        finally:
+            self.state_lock.release()
+        if changed:
+            self._state_dirty.set()
+        snapshot = {
             "client": {
-                "running": state["client_running"],
-                "connected": state["client_connected"],
-                "error": state.get("client_error", ""),
+                "running": client_running,
+                "connected": client_connected,
+                "error": client_error,
             },
             "server": {
-                "running": state["server_running"],
-                "connected": state["server_connected"],
-                "code": code,
-                "error": state.get("server_error", ""),
+                "running": server_running,
+                "connected": server_connected,
+                "code": server_code,
+                "error": server_error,
             },
-            "logs": logs,
+            "log_seq": log_seq,
         }
+        self._status_snapshot = snapshot
+        return snapshot
+
+    def rescan_devices(self):
+        if self._client_running() or self._server_running():
+            # Re-initializing PortAudio would pull the device out from under
+            # the open stream; only drop the cached lists.
+            streaming.invalidate_device_cache()
+            self._log("Stop streaming to rescan audio devices.")
+            return
+        try:
+            streaming.rescan_devices()
+        except Exception as exc:
+            self._log(f"Device rescan failed: {exc}")
 
     def get_pair_code(self, cfg=None):
         cfg = cfg or {}
@@ -620,12 +308,7 @@ class StreamController:
         if state.get("server_running") and state.get("server_port"):
             host = state.get("server_host") or streaming.advertised_host("0.0.0.0")
             port = state.get("server_port")
-            try:
-                code = streaming.encode_pair_code(host, port)
-            except ValueError as exc:
-                self._log(f"Code error: {exc}")
-                return {"code": "", "host": host, "port": port}
-            return {"code": code, "host": host, "port": port}
+            return {"code": state["server_code"], "host": host, "port": port}
         bind_host = (cfg.get("bind") or "0.0.0.0").strip()
         if not bind_host:
             bind_host = "0.0.0.0"
@@ -644,6 +327,11 @@ class Api:
         self.controller = controller
 
     def list_devices(self):
+        # Device queries are cached (with a short TTL) in streaming.
+        return streaming.list_devices()
+
+    def refresh_devices(self):
+        self.controller.rescan_devices()
         return streaming.list_devices()
 
     def start_client(self, cfg):
@@ -661,16 +349,38 @@ class Api:
     def get_status(self):
         return self.controller.status()
 
+    def get_logs(self, since_seq=0):
+        return self.controller.get_logs(since_seq)
+
     def get_pair_code(self, cfg=None):
         return self.controller.get_pair_code(cfg)
 
 
+def _push_status(window, controller):
+    closed = threading.Event()
+    window.events.closed += closed.set
+    last = None
+    while not closed.is_set():
+        # The timeout catches worker threads exiting without a final update.
+        controller.wait_for_change(timeout=1.0)
+        payload = json.dumps(controller.status())
+        if payload == last:
+            continue
+        try:
+            window.evaluate_js(f"applyStatus({payload})")
+        except Exception:
+            if closed.is_set():
+                break
+            continue
+        last = payload
+
+
 def run_app(default_mode="send"):
-    html = HTML.replace("{{DEFAULT_MODE}}", default_mode or "send")
+    html = _get_html(default_mode or "send")
     controller = StreamController()
     api = Api(controller)
     window = webview.create_window("Sound Transport", html=html, js_api=api)
-    webview.start(debug=False, gui=None)
+    webview.start(_push_status, (window, controller), debug=False, gui=None)
 
 
 if __name__ == "__main__":
@@ -32,6 +32,16 @@ def parse_args():
         action="store_true",
         help="Remove the output directory before building",
     )
+    parser.add_argument(
+        "--release",
+        action="store_true",
+        help="Optimized build: LTO, no site import, asserts stripped",
+    )
+    parser.add_argument(
+        "--pgo",
+        action="store_true",
+        help="With --release, add C-level PGO (runs the app once for training)",
+    )
     return parser.parse_args()
 
 
@@ -80,6 +90,11 @@ def main() -> int:
     if args.clean and os.path.isdir(output_dir):
         shutil.rmtree(output_dir)
 
+    index_html = os.path.join(os.path.dirname(entry), "index.html")
+    if not os.path.exists(index_html):
+        print(f"UI template not found: {index_html}", file=sys.stderr)
+        return 2
+
     system = platform.system()
     cmd = [
         sys.executable,
@@ -89,7 +104,25 @@ def main() -> int:
         f"--output-dir={output_dir}",
         f"--output-filename={args.name}",
         "--include-package=sounddevice",
+        f"--include-data-files={index_html}=index.html",
+        f"--jobs={os.cpu_count() or 2}",
     ]
+    if args.release:
+        cmd.extend(
+            [
+                "--lto=yes",
+                "--python-flag=no_site",
+                "--python-flag=no_asserts",
+            ]
+        )
+        if args.pgo:
+            cmd.append("--pgo-c")
+            print(
+                "PGO: Nuitka will launch the app for a training run; use it "
+                "briefly, then close the window to finish the build."
+            )
+    elif args.pgo:
+        print("--pgo only applies to --release builds; ignoring.", file=sys.stderr)
 
     if system == "Darwin":
         cmd.extend(
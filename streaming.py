@@ -1,18 +1,101 @@
 #!/usr/bin/env python3
+import ctypes
 import errno
+import functools
 import inspect
+import os
 import platform
 import queue
+import random
+import selectors
 import socket
+import struct
 import threading
 import time
 
+import numpy as np
 import sounddevice as sd
 
+try:
+    import rtmixer
+except ImportError:  # optional: keeps the PortAudio callback out of Python
+    rtmixer = None
+
+try:
+    from numba import njit
+except ImportError:  # optional: compiled downmix for multichannel loopback
+    njit = None
+
 
 PORT_BASE = 50000
 PORT_SPAN = 1000
 DEFAULT_PORT = 50007
+BIND_RETRIES = 6
+RANDOM_PORT_PROBES = 8
+SOCKET_BUF_BYTES = 1 << 20
+DEFAULT_SOCKET_OPTS = {
+    "nodelay": True,
+    "bufsize": SOCKET_BUF_BYTES,
+    "quickack": True,
+    "notsent_lowat_blocks": 2,
+}
+RING_BLOCKS = 16
+DEVICE_CACHE_TTL = 3.0
+LAN_IP_TTL = 30.0
+
+_DEVICES_CACHE = {"t": 0.0, "value": None}
+_DEFAULTS_CACHE = {"t": 0.0, "value": None}
+_LAN_IP_CACHE = {"t": 0.0, "value": None}
+_UNPACK_IPV4 = struct.Struct("!4B").unpack
+# Deletes every non-digit ASCII character.
+_KEEP_DIGITS = str.maketrans(
+    "", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit())
+)
+THREAD_PRIORITY_TIME_CRITICAL = 15
+# Core slots for pinned audio threads, counted down from the highest allowed
+# CPU so the sender, capture pump and server IO workers don't share a core.
+SENDER_CORE_SLOT = 0
+CAPTURE_CORE_SLOT = 1
+IO_CORE_SLOT = 2
+RECV_BLOCKS = 8
+
+
+class StopEvent(threading.Event):
+    # threading.Event that also makes a socket readable when set, so workers
+    # can sleep in select() on their sockets plus this event instead of
+    # polling with timeouts.
+    def __init__(self):
+        super().__init__()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    def fileno(self):
+        return self._wake_r.fileno()
+
+    def set(self):
+        super().set()
+        try:
+            self._wake_w.send(b"x")
+        except OSError:
+            pass
+
+    def clear(self):
+        super().clear()
+        try:
+            while self._wake_r.recv(64):
+                pass
+        except OSError:
+            pass
+
+
+def _stop_selector(sock, stop_event):
+    if not isinstance(stop_event, StopEvent):
+        return None
+    sel = selectors.DefaultSelector()
+    sel.register(sock, selectors.EVENT_READ)
+    sel.register(stop_event, selectors.EVENT_READ)
+    return sel
 
 
 def detect_os():
@@ -20,18 +103,71 @@ def detect_os():
     return name or "Unknown"
 
 
+def _cache_get(cache, ttl):
+    value = cache["value"]
+    if value is not None and time.monotonic() - cache["t"] < ttl:
+        return value
+    return None
+
+
+def _cache_put(cache, value):
+    cache["value"] = value
+    cache["t"] = time.monotonic()
+    return value
+
+
 def _default_devices():
+    cached = _cache_get(_DEFAULTS_CACHE, DEVICE_CACHE_TTL)
+    if cached is not None:
+        return cached
     default_in = None
     default_out = None
     try:
         default_in, default_out = sd.default.device
     except Exception:
         pass
-    return default_in, default_out
+    return _cache_put(_DEFAULTS_CACHE, (default_in, default_out))
+
+
+def _cached_query_devices():
+    cached = _cache_get(_DEVICES_CACHE, DEVICE_CACHE_TTL)
+    if cached is not None:
+        return cached
+    return _cache_put(_DEVICES_CACHE, sd.query_devices())
+
+
+@functools.lru_cache(maxsize=64)
+def _query_named_device(device):
+    return sd.query_devices(device)
+
+
+def _query_device_info(device):
+    if isinstance(device, int):
+        devices = _cached_query_devices()
+        if 0 <= device < len(devices):
+            return devices[device]
+        return sd.query_devices(device)
+    return _query_named_device(device)
+
+
+def invalidate_device_cache():
+    _DEVICES_CACHE["value"] = None
+    _DEFAULTS_CACHE["value"] = None
+    _query_named_device.cache_clear()
 
 
-def _wasapi_loopback_supported():
-    if not hasattr(sd, "WasapiSettings"):
+def rescan_devices():
+    # PortAudio enumerates devices once, in Pa_Initialize, so hotplugged
+    # devices only appear after a re-initialize. Every stream must be closed
+    # first; callers check that no client or server is running.
+    invalidate_device_cache()
+    if hasattr(sd, "_terminate") and hasattr(sd, "_initialize"):
+        sd._terminate()
+        sd._initialize()
+
+
+def _compute_wasapi_loopback_supported():
+    if detect_os() != "Windows" or not hasattr(sd, "WasapiSettings"):
         return False
     try:
         params = inspect.signature(sd.WasapiSettings).parameters
@@ -44,14 +180,68 @@ def _wasapi_loopback_supported():
             return False
 
 
+# The sounddevice build cannot change at runtime, so inspect it once.
+try:
+    _WASAPI_LOOPBACK_SUPPORTED = _compute_wasapi_loopback_supported()
+except Exception:
+    _WASAPI_LOOPBACK_SUPPORTED = False
+
+
+def _boost_thread_priority(slot=SENDER_CORE_SLOT):
+    # Best effort: raise the calling thread's scheduling priority. On Linux a
+    # thread that got SCHED_FIFO is also pinned to its own core (by slot),
+    # always leaving the lowest allowed CPU to everything else; without the
+    # boost, or without a spare core, affinity is left alone. Needs
+    # privileges on most systems; failures leave the thread as it was.
+    os_name = detect_os()
+    if os_name == "Windows":
+        try:
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(
+                kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL
+            )
+        except (AttributeError, OSError):
+            pass
+        return
+    if os_name != "Linux":
+        return
+    tid = threading.get_native_id()
+    try:
+        param = os.sched_param(os.sched_get_priority_min(os.SCHED_FIFO))
+        os.sched_setscheduler(tid, os.SCHED_FIFO, param)
+        allowed = sorted(os.sched_getaffinity(0), reverse=True)
+    except (AttributeError, OSError):
+        return
+    if slot >= len(allowed) - 1:
+        return
+    try:
+        os.sched_setaffinity(tid, {allowed[slot]})
+    except (AttributeError, OSError):
+        pass
+
+
+@functools.lru_cache(maxsize=128)
+def _resolve_host(host):
+    return socket.gethostbyname(host)
+
+
+@functools.lru_cache(maxsize=1)
+def _hostname_ip():
+    return socket.gethostbyname(socket.gethostname())
+
+
 def get_lan_ip():
+    cached = _cache_get(_LAN_IP_CACHE, LAN_IP_TTL)
+    if cached is not None:
+        return cached
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
         sock.connect(("8.8.8.8", 80))
-        return sock.getsockname()[0]
+        return _cache_put(_LAN_IP_CACHE, sock.getsockname()[0])
     except OSError:
+        _LAN_IP_CACHE["value"] = None
         try:
-            return socket.gethostbyname(socket.gethostname())
+            return _hostname_ip()
         except OSError:
             return None
     finally:
@@ -63,34 +253,52 @@ def get_lan_ip():
 
 def _parse_ipv4(host):
     try:
-        ip = socket.gethostbyname(host)
+        ip = _resolve_host(host)
     except OSError:
         ip = host
+    # A resolved host is always canonical dotted decimal, which inet_pton
+    # takes in one call. Only strings the resolver gave back untouched reach
+    # the split below (leading zeros are read as decimal there), which keeps
+    # the original error messages.
+    try:
+        return _UNPACK_IPV4(socket.inet_pton(socket.AF_INET, ip))
+    except (OSError, TypeError, ValueError):
+        pass
     parts = ip.split(".")
     if len(parts) != 4:
         raise ValueError("IPv4 address required")
-    try:
-        octets = [int(part) for part in parts]
-    except ValueError as exc:
-        raise ValueError("Invalid IPv4 address") from exc
-    for value in octets:
-        if value < 0 or value > 255:
-            raise ValueError("Invalid IPv4 address")
-    return octets
+    # isdecimal() rejects signs and anything int() would refuse, so the single
+    # mask test below covers the whole 0..255 range check.
+    if not all(part.isdecimal() for part in parts):
+        raise ValueError("Invalid IPv4 address")
+    octets = [int(part) for part in parts]
+    if (octets[0] | octets[1] | octets[2] | octets[3]) & ~0xFF:
+        raise ValueError("Invalid IPv4 address")
+    return tuple(octets)
 
 
+@functools.lru_cache(maxsize=4)
 def advertised_host(bind_host):
     if not bind_host or bind_host == "0.0.0.0":
         ip = get_lan_ip()
         if ip:
             return ip
         try:
-            return socket.gethostbyname(socket.gethostname())
+            return _hostname_ip()
         except OSError:
             return "127.0.0.1"
     return bind_host
 
 
+def invalidate_network_cache():
+    # Everything that remembers which address this machine has; cleared
+    # together so a network change is picked up on the next lookup.
+    _LAN_IP_CACHE["value"] = None
+    _hostname_ip.cache_clear()
+    _resolve_host.cache_clear()
+    advertised_host.cache_clear()
+
+
 def encode_pair_code(host, port):
     if port is None:
         port = DEFAULT_PORT
@@ -104,12 +312,11 @@ def encode_pair_code(host, port):
 def decode_pair_code(code):
     if not code:
         raise ValueError("Empty code")
-    digits = "".join(ch for ch in code if ch.isdigit())
-    if len(digits) != 9:
+    digits = code.translate(_KEEP_DIGITS)
+    if len(digits) != 9 or not digits.isdigit():
         raise ValueError("Code must be 9 digits")
-    c = int(digits[0:3])
-    d = int(digits[3:6])
-    offset = int(digits[6:9])
+    n, offset = divmod(int(digits), 1000)
+    c, d = divmod(n, 1000)
     if c > 255 or d > 255:
         raise ValueError("Invalid code")
     local_ip = get_lan_ip()
@@ -121,35 +328,59 @@ def decode_pair_code(code):
     return host, port
 
 
-def _bind_server_socket(bind_host, port):
+def _bind_server_socket(bind_host, port, bufsize=None):
     def make_socket():
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if bufsize:
+            # Set before listen() so accepted sockets negotiate a matching
+            # TCP window scale.
+            _set_buffer_sizes(sock, bufsize)
         sock.settimeout(0.5)
         return sock
 
-    if port is not None:
+    def try_bind(candidate):
         server = make_socket()
-        server.bind((bind_host, int(port)))
-        server.listen(1)
-        return server, int(port)
+        try:
+            server.bind((bind_host, candidate))
+            server.listen(1)
+        except OSError:
+            server.close()
+            raise
+        return server
 
-    candidates = [DEFAULT_PORT]
-    for offset in range(PORT_SPAN):
-        candidate = PORT_BASE + offset
-        if candidate not in candidates:
-            candidates.append(candidate)
+    if port is not None:
+        # A requested port may just be lingering from a previous run; retry
+        # it briefly with exponential backoff before giving up.
+        port = int(port)
+        for attempt in range(BIND_RETRIES):
+            try:
+                return try_bind(port), port
+            except OSError as exc:
+                if exc.errno != errno.EADDRINUSE or attempt == BIND_RETRIES - 1:
+                    raise
+            time.sleep(min(0.001 * (2 ** attempt), 0.05))
+
+    # Letting the kernel pick (port 0) is no help, as pair codes need a port
+    # inside PORT_BASE..PORT_BASE+PORT_SPAN. Instead, after the default
+    # port, try a few random ports in range so concurrent receivers rarely
+    # collide, and only then walk the whole range.
+    others = [
+        candidate
+        for candidate in range(PORT_BASE, PORT_BASE + PORT_SPAN)
+        if candidate != DEFAULT_PORT
+    ]
+    probes = random.sample(others, min(RANDOM_PORT_PROBES, len(others)))
+    probed = set(probes)
+    candidates = [DEFAULT_PORT] + probes
+    candidates += [candidate for candidate in others if candidate not in probed]
 
     last_error = None
     for candidate in candidates:
-        server = make_socket()
         try:
-            server.bind((bind_host, candidate))
-            server.listen(1)
-            return server, candidate
+            return try_bind(candidate), candidate
         except OSError as exc:
             last_error = exc
-            server.close()
             if exc.errno in (errno.EADDRINUSE, errno.EACCES):
                 continue
             raise
@@ -159,6 +390,140 @@ def _bind_server_socket(bind_host, port):
     raise OSError("No free ports available")
 
 
+def _set_buffer_sizes(sock, bufsize):
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(bufsize))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, int(bufsize))
+
+
+def _apply_socket_opts(sock, socket_opts, log, block_bytes=None):
+    opts = dict(DEFAULT_SOCKET_OPTS)
+    if socket_opts:
+        opts.update(socket_opts)
+    try:
+        if opts.get("nodelay"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        bufsize = opts.get("bufsize")
+        if bufsize:
+            _set_buffer_sizes(sock, bufsize)
+        if opts.get("quickack") and hasattr(socket, "TCP_QUICKACK"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        # Keep only a couple of blocks unsent in the kernel so a large send
+        # buffer does not turn into added latency.
+        lowat_blocks = opts.get("notsent_lowat_blocks")
+        if lowat_blocks and block_bytes and hasattr(socket, "TCP_NOTSENT_LOWAT"):
+            sock.setsockopt(
+                socket.IPPROTO_TCP,
+                socket.TCP_NOTSENT_LOWAT,
+                int(lowat_blocks) * int(block_bytes),
+            )
+    except OSError as exc:
+        log(f"Socket option error: {exc}")
+
+
+def _send_blocks(sock, blocks):
+    views = [memoryview(block).cast("B") for block in blocks]
+    if len(views) == 1:
+        sock.sendall(views[0])
+        return
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(views))
+        return
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if views and sent:
+            views[0] = views[0][sent:]
+
+
+def _ring_frames(blocksize):
+    frames = max(1, int(blocksize)) * RING_BLOCKS
+    return 1 << (frames - 1).bit_length()
+
+
+def _float32_to_int16(data, channels, downmix, scratch, out):
+    # scratch is a float32 buffer of at least frames * channels samples; the
+    # int16 result is written into out.
+    samples = np.frombuffer(data, dtype=np.float32)
+    if downmix:
+        frames = samples.size // channels
+        samples = np.mean(
+            samples.reshape(frames, channels), axis=1, out=scratch[:frames]
+        )
+        np.multiply(samples, 32767.0, out=samples)
+    else:
+        samples = np.multiply(samples, 32767.0, out=scratch[: samples.size])
+    np.clip(samples, -32768, 32767, out=samples)
+    np.copyto(out, samples, casting="unsafe")
+    return out
+
+
+def _downmix_to_mono_i16(indata, out, channels):
+    # Same result as summing to int32 and floor-dividing, without temporaries.
+    for i in range(indata.shape[0]):
+        acc = np.int32(0)
+        for c in range(channels):
+            acc += indata[i, c]
+        out[i] = acc // channels
+
+
+def _compile_downmix_kernel():
+    # njit(cache=True) raises if numba cannot find a cache locator (e.g. in a
+    # frozen build); fall back to NumPy and report why on first use.
+    if njit is None:
+        return None, ""
+    try:
+        return njit(cache=True)(_downmix_to_mono_i16), ""
+    except Exception as exc:
+        return None, str(exc)
+
+
+_downmix_kernel, _downmix_kernel_error = _compile_downmix_kernel()
+
+
+def _int16_to_float32(data, scratch):
+    samples = np.frombuffer(data, dtype=np.int16)
+    out = scratch[: samples.size]
+    np.multiply(samples, 1.0 / 32768.0, out=out, dtype=np.float32)
+    return out
+
+
+def _noop_state(key, value):
+    pass
+
+
+def _wrap_state_cb(state_cb):
+    if state_cb is None:
+        return _noop_state
+
+    def set_state(key, value):
+        try:
+            state_cb(key, value)
+        except Exception:
+            pass
+
+    return set_state
+
+
+def _wrap_states_cb(states_cb, set_state):
+    if states_cb is None:
+
+        def set_states(**updates):
+            for key, value in updates.items():
+                set_state(key, value)
+
+        return set_states
+
+    def set_states(**updates):
+        try:
+            states_cb(**updates)
+        except Exception:
+            pass
+
+    return set_states
+
+
 def normalize_device(device):
     if device is None:
         return None
@@ -174,7 +539,7 @@ def normalize_device(device):
 def _find_windows_loopback_device():
     keywords = ("stereo mix", "what u hear", "loopback", "monitor")
     try:
-        devices = sd.query_devices()
+        devices = _cached_query_devices()
     except Exception:
         return None
     for idx, dev in enumerate(devices):
@@ -186,7 +551,15 @@ def _find_windows_loopback_device():
 
 
 def _try_wasapi_loopback(log):
-    if not _wasapi_loopback_supported():
+    if not _WASAPI_LOOPBACK_SUPPORTED:
+        return None
+    try:
+        return sd.WasapiSettings(loopback=True)
+    except TypeError:
+        log(
+            "This sounddevice build does not support WASAPI loopback. "
+            "Enable 'Stereo Mix' or install a virtual cable and select it."
+        )
         return None
 
 
@@ -198,7 +571,7 @@ def _adjust_input_device(device, channels, log):
         device = default_in
     if device is not None:
         try:
-            info = sd.query_devices(device)
+            info = _query_device_info(device)
         except Exception as exc:
             log(f"Device query failed: {exc}")
             info = None
@@ -207,7 +580,7 @@ def _adjust_input_device(device, channels, log):
         default_in, _ = _default_devices()
         device = default_in
         try:
-            info = sd.query_devices(device) if device is not None else None
+            info = _query_device_info(device) if device is not None else None
         except Exception:
             info = None
     if info is not None:
@@ -215,19 +588,11 @@ def _adjust_input_device(device, channels, log):
         if max_ch > 0 and channels > max_ch:
             log(f"Reducing channels to {max_ch} to match device.")
             channels = max_ch
-    return device, channels
-    try:
-        return sd.WasapiSettings(loopback=True)
-    except TypeError:
-        log(
-            "This sounddevice build does not support WASAPI loopback. "
-            "Enable 'Stereo Mix' or install a virtual cable and select it."
-        )
-        return None
+    return device, channels, info
 
 
 def list_devices():
-    devices = sd.query_devices()
+    devices = _cached_query_devices()
     inputs = []
     outputs = []
     for idx, dev in enumerate(devices):
@@ -243,7 +608,7 @@ def list_devices():
 
     os_name = detect_os()
     if os_name == "Windows":
-        loopback_supported = _wasapi_loopback_supported()
+        loopback_supported = _WASAPI_LOOPBACK_SUPPORTED
         if loopback_supported:
             system_devices = outputs
             default_system = default_out
@@ -298,7 +663,11 @@ def client_worker(
     log,
     source="mic",
     state_cb=None,
+    socket_opts=None,
+    batch=8,
+    states_cb=None,
 ):
+    global _downmix_kernel, _downmix_kernel_error
     source = (source or "mic").strip().lower()
     if source not in ("mic", "system"):
         source = "mic"
@@ -329,13 +698,16 @@ def client_worker(
             if device is None:
                 device = default_in
             log(f"System audio on {os_name} needs a virtual input device.")
+    # One device lookup for setup: _adjust_input_device returns the info it
+    # already fetched, the loopback branch fetches the output device once.
+    info = None
     if extra_settings is None:
-        device, channels = _adjust_input_device(device, channels, log)
+        device, channels, info = _adjust_input_device(device, channels, log)
     network_channels = max(1, int(channels))
     capture_channels = network_channels
     if extra_settings is not None:
         try:
-            info = sd.query_devices(device if device is not None else default_out)
+            info = _query_device_info(device if device is not None else default_out)
         except Exception:
             info = None
         if info is not None:
@@ -350,10 +722,6 @@ def client_worker(
                     if network_channels != 1:
                         network_channels = capture_channels
     elif source == "system":
-        try:
-            info = sd.query_devices(device) if device is not None else None
-        except Exception:
-            info = None
         if info is not None:
             max_in = int(info.get("max_input_channels", 0))
             if max_in > 0 and max_in != capture_channels:
@@ -363,47 +731,87 @@ def client_worker(
                         f"Input device uses {capture_channels} channels; "
                         "downmixing to mono."
                     )
-    block_bytes = int(blocksize) * int(network_channels) * 2  # int16
-    audio_queue = queue.Queue(maxsize=int(max_queue))
-
-    def set_state(key, value):
-        if state_cb is None:
-            return
+    block_frames = int(blocksize)
+    block_bytes = block_frames * int(network_channels) * 2  # int16
+    batch_limit = max(1, int(batch))
+    downmix = capture_channels != network_channels and network_channels == 1
+    passthrough = capture_channels == network_channels
+    short_block_logged = [False]
+    downmix_i32 = np.empty(block_frames, dtype=np.int32)
+    # Fixed pool of wire-format blocks. The queue carries slot indices and a
+    # slot goes back on free_slots once the sender has written it out, so the
+    # capture path never allocates. The pool is also the backpressure: with no
+    # free slot the block is dropped, so the unbounded SPSC audio_queue never
+    # holds more than pool_size entries.
+    audio_queue = queue.SimpleQueue()
+    pool_size = int(max_queue) + batch_limit
+    pool = [bytearray(block_bytes) for _ in range(pool_size)]
+    pool_i16 = [np.frombuffer(slot, dtype=np.int16) for slot in pool]
+    free_slots = queue.SimpleQueue()
+    for idx in range(pool_size):
+        free_slots.put(idx)
+    downmix_kernel = _downmix_kernel if downmix else None
+    if downmix_kernel is not None:
+        # Compile (or load from cache) now rather than in the first callback.
         try:
-            state_cb(key, value)
-        except Exception:
-            pass
+            downmix_kernel(
+                np.zeros((block_frames, int(capture_channels)), dtype=np.int16),
+                pool_i16[0],
+                int(capture_channels),
+            )
+        except Exception as exc:
+            _downmix_kernel = downmix_kernel = None
+            _downmix_kernel_error = str(exc)
+    if downmix and _downmix_kernel_error:
+        log(f"numba downmix unavailable ({_downmix_kernel_error}); using NumPy.")
+        _downmix_kernel_error = ""
+
+    set_state = _wrap_state_cb(state_cb)
+    set_states = _wrap_states_cb(states_cb, set_state)
 
-    set_state("client_running", True)
-    set_state("client_connected", False)
+    set_states(client_running=True, client_connected=False)
 
     try:
         sock = socket.create_connection((host, int(port)), timeout=5.0)
         sock.settimeout(None)
-        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     except OSError as exc:
         log(f"Connect failed: {exc}")
-        set_state("client_error", f"Connect failed: {exc}")
-        set_state("client_running", False)
+        set_states(client_error=f"Connect failed: {exc}", client_running=False)
         return
+    _apply_socket_opts(sock, socket_opts, log, block_bytes)
     log(f"Connected to {host}:{port}")
-    set_state("client_connected", True)
-    set_state("client_error", "")
+    set_states(client_connected=True, client_error="")
 
     def sender():
+        _boost_thread_priority()
         try:
-            while True:
-                data = audio_queue.get()
-                if data is None:
+            done = False
+            while not done:
+                idx = audio_queue.get()
+                if idx is None:
                     break
+                slots = [idx]
+                while len(slots) < batch_limit:
+                    try:
+                        idx = audio_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if idx is None:
+                        done = True
+                        break
+                    slots.append(idx)
                 try:
-                    sock.sendall(data)
+                    _send_blocks(sock, [pool[i] for i in slots])
                 except OSError as exc:
                     log(f"Sender stopped: {exc}")
                     stop_event.set()
-                    set_state("client_error", f"Send failed: {exc}")
-                    set_state("client_connected", False)
+                    set_states(
+                        client_error=f"Send failed: {exc}", client_connected=False
+                    )
                     break
+                finally:
+                    for i in slots:
+                        free_slots.put(i)
         finally:
             try:
                 sock.close()
@@ -415,22 +823,39 @@ def client_worker(
             return
         if status:
             log(f"Input status: {status}")
-        if capture_channels != network_channels and network_channels == 1:
-            try:
-                mono = (indata.astype("int32").sum(axis=1) // capture_channels).astype(
-                    "int16"
-                )
-            except Exception:
-                return
-            data = mono.tobytes()
-        else:
-            data = indata.tobytes()
-        if len(data) != block_bytes:
+        # The stream is opened with a fixed blocksize, so frames only differs
+        # for a short block at start/stop; pad that with silence. Larger
+        # blocks would overrun the slot and are dropped.
+        if frames > block_frames or not (downmix or passthrough):
             return
+        if frames < block_frames and not short_block_logged[0]:
+            short_block_logged[0] = True
+            log(f"Short capture block ({frames}/{block_frames}); padding.")
         try:
-            audio_queue.put_nowait(data)
-        except queue.Full:
-            pass
+            idx = free_slots.get_nowait()
+        except queue.Empty:
+            return
+        slot = pool_i16[idx]
+        try:
+            if downmix_kernel is not None:
+                downmix_kernel(indata, slot, capture_channels)
+                filled = frames
+            elif downmix:
+                acc = downmix_i32[:frames]
+                np.sum(indata, axis=1, dtype=np.int32, out=acc)
+                np.floor_divide(acc, capture_channels, out=acc)
+                np.copyto(slot[:frames], acc, casting="unsafe")
+                filled = frames
+            else:
+                flat = indata.reshape(-1)
+                slot[: flat.size] = flat
+                filled = flat.size
+            if filled < slot.size:
+                slot[filled:] = 0
+        except Exception:
+            free_slots.put(idx)
+            return
+        audio_queue.put(idx)
 
     sender_thread = threading.Thread(target=sender, daemon=True)
     sender_thread.start()
@@ -446,50 +871,98 @@ def client_worker(
         }
         if extra_settings is not None:
             stream_kwargs["extra_settings"] = extra_settings
+        source_label = "system audio" if source == "system" else "microphone"
+        streaming_msg = (
+            f"Streaming {source_label} to {host}:{port} at "
+            f"{samplerate} Hz, {network_channels} ch."
+        )
 
-        with sd.InputStream(**stream_kwargs):
-            source_label = "system audio" if source == "system" else "microphone"
-            log(
-                f"Streaming {source_label} to {host}:{port} at "
-                f"{samplerate} Hz, {network_channels} ch."
-            )
-            while not stop_event.is_set():
-                time.sleep(0.2)
+        if rtmixer is not None:
+            _boost_thread_priority(CAPTURE_CORE_SLOT)
+            # rtmixer records float32 frames into the ring from C; this thread
+            # only converts whole blocks and hands them to the sender.
+            del stream_kwargs["dtype"], stream_kwargs["callback"]
+            frames = int(blocksize)
+            wait_s = frames / float(samplerate) / 2
+            ring = rtmixer.RingBuffer(4 * int(capture_channels), _ring_frames(frames))
+            scratch = np.empty(frames * int(capture_channels), dtype=np.float32)
+            with rtmixer.Recorder(**stream_kwargs) as recorder:
+                action = recorder.record_ringbuffer(ring)
+                log(streaming_msg)
+                while not stop_event.is_set():
+                    if ring.read_available < frames:
+                        # rtmixer drops the action once the ring fills (this
+                        # thread stalled); start a new one after draining.
+                        if action not in recorder.actions:
+                            action = recorder.record_ringbuffer(ring)
+                        stop_event.wait(wait_s)
+                        continue
+                    data = ring.read(frames)
+                    try:
+                        idx = free_slots.get_nowait()
+                    except queue.Empty:
+                        continue
+                    _float32_to_int16(
+                        data, int(capture_channels), downmix, scratch, pool_i16[idx]
+                    )
+                    audio_queue.put(idx)
+        else:
+            with sd.InputStream(**stream_kwargs):
+                log(streaming_msg)
+                stop_event.wait()
     except Exception as exc:
         log(f"Client error: {exc}")
         set_state("client_error", f"Client error: {exc}")
         stop_event.set()
     finally:
-        while True:
-            try:
-                audio_queue.put_nowait(None)
-                break
-            except queue.Full:
-                try:
-                    audio_queue.get_nowait()
-                except queue.Empty:
-                    pass
+        audio_queue.put(None)
         sender_thread.join(timeout=1.0)
-        set_state("client_connected", False)
-        set_state("client_running", False)
+        set_states(client_connected=False, client_running=False)
         log("Client stopped")
 
 
-def _recv_exact(sock, nbytes, stop_event):
-    data = bytearray()
-    while len(data) < nbytes:
-        if stop_event.is_set():
-            return None
-        try:
-            chunk = sock.recv(nbytes - len(data))
-        except socket.timeout:
-            continue
-        except OSError:
-            return None
-        if not chunk:
-            return None
-        data.extend(chunk)
-    return bytes(data)
+def _iter_blocks(
+    sock, block_bytes, stop_event, nblocks=RECV_BLOCKS, quickack=False
+):
+    # Yields views into one reusable buffer; each view is only valid until
+    # the next block is requested. TCP_QUICKACK is not sticky (the kernel
+    # drops back to delayed ACKs on its own), so it is re-armed per read.
+    buf = bytearray(block_bytes * max(1, int(nblocks)))
+    mv = memoryview(buf)
+    head = 0
+    sel = _stop_selector(sock, stop_event)
+    try:
+        while not stop_event.is_set():
+            if sel is not None:
+                sel.select()
+                if stop_event.is_set():
+                    return
+            try:
+                n = sock.recv_into(mv[head:])
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not n:
+                return
+            if quickack:
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+                except OSError:
+                    quickack = False
+            head += n
+            full = head - head % block_bytes
+            for offset in range(0, full, block_bytes):
+                yield mv[offset:offset + block_bytes]
+                if stop_event.is_set():
+                    return
+            if full:
+                leftover = head - full
+                mv[:leftover] = mv[full:head]
+                head = leftover
+    finally:
+        if sel is not None:
+            sel.close()
 
 
 def server_worker(
@@ -502,49 +975,80 @@ def server_worker(
     stop_event,
     log,
     state_cb=None,
+    socket_opts=None,
+    io_workers=1,
+    states_cb=None,
 ):
     device = normalize_device(device)
     block_bytes = int(blocksize) * int(channels) * 2  # int16
 
-    def set_state(key, value):
-        if state_cb is None:
-            return
-        try:
-            state_cb(key, value)
-        except Exception:
-            pass
+    set_state = _wrap_state_cb(state_cb)
+    set_states = _wrap_states_cb(states_cb, set_state)
 
-    set_state("server_running", True)
-    set_state("server_connected", False)
+    set_states(server_running=True, server_connected=False)
+    opts = dict(DEFAULT_SOCKET_OPTS, **(socket_opts or {}))
+    quickack = bool(opts.get("quickack")) and hasattr(socket, "TCP_QUICKACK")
 
     try:
-        server, bound_port = _bind_server_socket(bind_host, port)
+        server, bound_port = _bind_server_socket(
+            bind_host, port, opts.get("bufsize")
+        )
     except OSError as exc:
         log(f"Server bind failed: {exc}")
-        set_state("server_error", f"Bind failed: {exc}")
-        set_state("server_running", False)
+        set_states(server_error=f"Bind failed: {exc}", server_running=False)
         return
 
-    set_state("server_port", bound_port)
-    set_state("server_host", advertised_host(bind_host))
-    set_state("server_error", "")
+    server_host = advertised_host(bind_host)
+    try:
+        server_code = encode_pair_code(server_host, bound_port)
+    except ValueError as exc:
+        log(f"Code error: {exc}")
+        server_code = ""
+    set_states(
+        server_port=bound_port,
+        server_host=server_host,
+        server_code=server_code,
+        server_error="",
+    )
     log(f"Listening on {bind_host}:{bound_port}")
 
-    try:
-        while not stop_event.is_set():
-            try:
-                conn, addr = server.accept()
-            except socket.timeout:
-                continue
-            except OSError as exc:
-                log(f"Accept error: {exc}")
-                set_state("server_error", f"Accept error: {exc}")
-                break
+    conn_queue = queue.SimpleQueue()
+    active_lock = threading.Lock()
+    active = [0]
 
-            log(f"Client connected: {addr[0]}:{addr[1]}")
-            set_state("server_connected", True)
-            conn.settimeout(0.5)
-            try:
+    def play_via_ringbuffer(conn):
+        frames = int(blocksize)
+        wait_s = frames / float(samplerate) / 2
+        ring = rtmixer.RingBuffer(4 * int(channels), _ring_frames(frames))
+        scratch = np.empty(frames * int(channels), dtype=np.float32)
+        with rtmixer.Mixer(
+            samplerate=int(samplerate),
+            channels=int(channels),
+            blocksize=frames,
+            device=device,
+        ) as mixer:
+            action = None
+            for data in _iter_blocks(
+                conn, block_bytes, stop_event, quickack=quickack
+            ):
+                while ring.write_available < frames and not stop_event.is_set():
+                    stop_event.wait(wait_s)
+                ring.write(_int16_to_float32(data, scratch))
+                if action is None or action not in mixer.actions:
+                    # Start once a block is queued so playback never begins
+                    # on an empty ring. The action ends when the ring runs
+                    # dry (a network stall), so start a new one after that.
+                    action = mixer.play_ringbuffer(ring)
+
+    def handle_connection(conn, addr):
+        log(f"Client connected: {addr[0]}:{addr[1]}")
+        with active_lock:
+            active[0] += 1
+        set_state("server_connected", True)
+        try:
+            if rtmixer is not None:
+                play_via_ringbuffer(conn)
+            else:
                 with sd.RawOutputStream(
                     samplerate=int(samplerate),
                     channels=int(channels),
@@ -552,22 +1056,85 @@ def server_worker(
                     blocksize=int(blocksize),
                     device=device,
                 ) as stream:
-                    while not stop_event.is_set():
-                        data = _recv_exact(conn, block_bytes, stop_event)
-                        if data is None:
-                            break
+                    for data in _iter_blocks(
+                        conn, block_bytes, stop_event, quickack=quickack
+                    ):
                         stream.write(data)
-            except Exception as exc:
-                log(f"Stream error: {exc}")
-                set_state("server_error", f"Stream error: {exc}")
-            finally:
+        except Exception as exc:
+            log(f"Stream error: {exc}")
+            set_state("server_error", f"Stream error: {exc}")
+        finally:
+            try:
+                conn.close()
+            except OSError:
+                pass
+            with active_lock:
+                active[0] -= 1
+                still_connected = active[0] > 0
+            set_state("server_connected", still_connected)
+            log("Client disconnected")
+
+    def io_loop(slot):
+        _boost_thread_priority(slot)
+        while True:
+            item = conn_queue.get()
+            if item is None:
+                break
+            conn, addr = item
+            if stop_event.is_set():
                 try:
                     conn.close()
                 except OSError:
                     pass
-                set_state("server_connected", False)
-                log("Client disconnected")
+                continue
+            handle_connection(conn, addr)
+
+    # Accept here, do audio IO on dedicated threads; each connection stays on
+    # the thread that picked it up for its whole lifetime.
+    io_threads = [
+        threading.Thread(target=io_loop, args=(IO_CORE_SLOT + i,), daemon=True)
+        for i in range(max(1, int(io_workers)))
+    ]
+    for thread in io_threads:
+        thread.start()
+
+    # With a StopEvent, sleep in select() until a sender connects or stop is
+    # requested; a plain Event falls back to the listener's 0.5s timeout.
+    sel = _stop_selector(server, stop_event)
+    try:
+        while not stop_event.is_set():
+            if sel is not None:
+                sel.select()
+                if stop_event.is_set():
+                    break
+            try:
+                conn, addr = server.accept()
+            except socket.timeout:
+                continue
+            except OSError as exc:
+                log(f"Accept error: {exc}")
+                set_state("server_error", f"Accept error: {exc}")
+                break
+            _apply_socket_opts(conn, socket_opts, log, block_bytes)
+            conn.settimeout(0.5)
+            conn_queue.put((conn, addr))
     finally:
+        if sel is not None:
+            sel.close()
         server.close()
+        for _ in io_threads:
+            conn_queue.put(None)
+        for thread in io_threads:
+            thread.join(timeout=1.0)
+        while True:
+            try:
+                item = conn_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                try:
+                    item[0].close()
+                except OSError:
+                    pass
         set_state("server_running", False)
         log("Server stopped")